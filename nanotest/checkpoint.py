@@ -0,0 +1,135 @@
+import os
+import struct
+from itertools import islice
+from typing import Iterable, Iterator, NamedTuple
+
+import nanolib
+
+from .docker import Chain
+
+CHECKPOINT_MAGIC = b"NTCK"
+CHECKPOINT_VERSION = 1
+CHECKPOINT_HEADER = struct.Struct(">4sB")
+# private key, public key, frontier hash, balance (u128), representative public key
+CHECKPOINT_RECORD = struct.Struct(">32s32s32s16s32s")
+
+
+class Frontier(NamedTuple):
+    """
+    Minimal stand-in for `Block` that is enough for `Chain` to build the next block on top of it.
+    """
+
+    block_hash: str
+    balance: int
+    representative: str
+
+
+class ChainState(NamedTuple):
+    private_key: bytes
+    public_key: bytes
+    frontier_hash: bytes
+    balance: int
+    representative: bytes
+
+    @property
+    def account_id(self) -> str:
+        return nanolib.get_account_id(public_key=self.public_key.hex())
+
+    def to_chain(self) -> Chain:
+        frontier = Frontier(
+            self.frontier_hash.hex().upper(),
+            self.balance,
+            nanolib.get_account_id(public_key=self.representative.hex()),
+        )
+        chain = Chain(self.account_id, self.private_key.hex(), frontier)
+        chain.precompute_work()
+        return chain
+
+    @classmethod
+    def from_chain(cls, chain: Chain) -> "ChainState":
+        if not chain.frontier:
+            raise ValueError("Account not opened")
+
+        return cls(
+            bytes.fromhex(chain.private_key),
+            bytes.fromhex(nanolib.get_account_public_key(account_id=chain.account_id)),
+            bytes.fromhex(chain.frontier.block_hash),
+            int(chain.frontier.balance),
+            bytes.fromhex(
+                nanolib.get_account_public_key(account_id=chain.frontier.representative)
+            ),
+        )
+
+
+def save_checkpoint(path, states: Iterable[ChainState]) -> int:
+    """
+    Write chain states to `path` atomically, returns the number of records written.
+    """
+    cnt = 0
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(CHECKPOINT_HEADER.pack(CHECKPOINT_MAGIC, CHECKPOINT_VERSION))
+        for state in states:
+            f.write(
+                CHECKPOINT_RECORD.pack(
+                    state.private_key,
+                    state.public_key,
+                    state.frontier_hash,
+                    state.balance.to_bytes(16, "big"),
+                    state.representative,
+                )
+            )
+            cnt += 1
+    os.replace(tmp_path, path)
+    return cnt
+
+
+def load_checkpoint(path) -> Iterator[ChainState]:
+    """
+    Lazily read chain states from `path`, one record at a time.
+    """
+    with open(path, "rb") as f:
+        magic, version = CHECKPOINT_HEADER.unpack(f.read(CHECKPOINT_HEADER.size))
+        if magic != CHECKPOINT_MAGIC or version != CHECKPOINT_VERSION:
+            raise ValueError(f"Not a chain checkpoint: {path}")
+
+        while record := f.read(CHECKPOINT_RECORD.size):
+            if len(record) != CHECKPOINT_RECORD.size:
+                raise ValueError(f"Truncated chain checkpoint: {path}")
+            private_key, public_key, frontier_hash, balance, representative = (
+                CHECKPOINT_RECORD.unpack(record)
+            )
+            yield ChainState(
+                private_key,
+                public_key,
+                frontier_hash,
+                int.from_bytes(balance, "big"),
+                representative,
+            )
+
+
+def checkpoint_count(path) -> int:
+    size = os.path.getsize(path) - CHECKPOINT_HEADER.size
+    return size // CHECKPOINT_RECORD.size
+
+
+def live_chain_states(
+    node, states: Iterable[ChainState], batch_size=1000
+) -> Iterator[ChainState]:
+    """
+    Skip states whose frontier does not match the ledger of `node`, eg. after the ledger was reset.
+    """
+    states = iter(states)
+    while batch := list(islice(states, batch_size)):
+        accounts = [state.account_id for state in batch]
+        res = node.rpc.call("accounts_frontiers", {"accounts": accounts})
+        frontiers = {
+            nanolib.get_account_public_key(account_id=account): frontier.upper()
+            for account, frontier in (res.get("frontiers") or {}).items()
+        }
+        for state in batch:
+            if (
+                frontiers.get(state.public_key.hex().upper())
+                == state.frontier_hash.hex().upper()
+            ):
+                yield state
@@ -13,13 +13,16 @@ import nanolib
 from retry import retry
 
 from .common import *
+from .elections import *
+from .logs import *
+from .network import *
+from .workgen import *
 
 NAME_PREFIX = "nano-baseline"
 RPC_PORT = 17076
 HOST_RPC_PORT = 17076
 BURN_ACCOUNT = "nano_1111111111111111111111111111111111111111111111111111hifc8npp"
 DEFAULT_REPR = BURN_ACCOUNT
-DIFFICULTY = "0000000000000000"
 NODE_IMAGE_NAME = "nano-node"
 PROM_EXPORTER_IMAGE_NAME = "nano-prom-exporter"
 CPUS_PER_NODE = 4
@@ -92,12 +95,26 @@ class Chain:
     def balance(self):
         return self.frontier.balance
 
+    def __attach_work(self, block_nlib: nanolib.Block, difficulty):
+        block_nlib.difficulty = difficulty
+        block_nlib.work = default_work_generator().work(
+            self.account_id, block_nlib.work_block_hash, difficulty
+        )
+
+    def precompute_work(self):
+        if self.frontier:
+            root = self.frontier.block_hash
+        else:
+            root = nanolib.get_account_public_key(account_id=self.account_id)
+        default_work_generator().precompute(self.account_id, root)
+
     def send(
         self,
         account: Union["NanoWalletAccount", "Chain", str],
         amount,
         block_queue: BlockQueue = default_queue,
         fork=False,
+        precompute=True,
     ):
         if amount <= 0:
             raise ValueError("Amount must be positive")
@@ -115,12 +132,14 @@ class Chain:
             balance=self.frontier.balance - amount,
         )
         block_nlib.sign(self.private_key)
-        block_nlib.solve_work(DIFFICULTY)
+        self.__attach_work(block_nlib, default_work_generator().thresholds.send)
 
         block = Block(block_nlib, self.frontier)
         block_queue.append(block)
         if not fork:
             self.frontier = block
+        if precompute:
+            self.precompute_work()
         return block
 
     def receive(
@@ -129,6 +148,7 @@ class Chain:
         representative=None,
         block_queue: BlockQueue = default_queue,
         fork=False,
+        precompute=True,
     ) -> Block:
         if not self.frontier:
             # open account
@@ -147,7 +167,7 @@ class Chain:
                 balance=block.send_amount,
             )
             block_nlib.sign(self.private_key)
-            block_nlib.solve_work(DIFFICULTY)
+            self.__attach_work(block_nlib, default_work_generator().thresholds.receive)
 
             block = Block(block_nlib, None)
 
@@ -166,13 +186,15 @@ class Chain:
                 balance=int(self.frontier.balance + block.send_amount),
             )
             block_nlib.sign(self.private_key)
-            block_nlib.solve_work(DIFFICULTY)
+            self.__attach_work(block_nlib, default_work_generator().thresholds.receive)
 
             block = Block(block_nlib, self.frontier)
 
         block_queue.append(block)
         if not fork:
             self.frontier = block
+        if precompute:
+            self.precompute_work()
         return block
 
 
@@ -214,7 +236,9 @@ class NanoWalletAccount:
     def to_chain(self) -> Chain:
         frontier_hash = self.node.rpc.account_info(self.account_id)["frontier"]
         frontier = self.node.block(frontier_hash)
-        return Chain(self.account_id, self.private_key, frontier)
+        chain = Chain(self.account_id, self.private_key, frontier)
+        chain.precompute_work()
+        return chain
 
 
 class NanoWallet:
@@ -265,9 +289,11 @@ class NanoNodeRPC:
 
 
 class NanoNode:
-    def __init__(self, container):
+    def __init__(self, container, network_profile: NetworkProfile = None):
         self.container = container
         self.rpc = nano.rpc.Client(self.rpc_address)
+        self.network_profile = network_profile
+        self.link_profiles: dict[str, NetworkProfile] = {}
 
     @property
     def rpc_address(self):
@@ -286,6 +312,22 @@ class NanoNode:
     def host_rpc_port(self):
         return int(self.container.ports[f"{RPC_PORT}/tcp"][0]["HostPort"])
 
+    @property
+    def websocket_address(self) -> str:
+        # only published when the net follows node events
+        ports = self.container.ports.get(f"{WEBSOCKET_PORT}/tcp")
+        if not ports:
+            return None
+        return f"ws://localhost:{ports[0]['HostPort']}"
+
+    @property
+    def ip_address(self) -> str:
+        networks = self.container.attrs["NetworkSettings"]["Networks"]
+        return next(iter(networks.values()))["IPAddress"]
+
+    def apply_impairment(self):
+        apply_impairment(self.container, self.network_profile, self.link_profiles)
+
     @property
     def full_name(self) -> str:
         return self.container.name
@@ -360,6 +402,19 @@ class NanoNode:
     @property
     def stat_objects(self):
         res = self.rpc.call("stats", {"type": "objects"})
+        return res
+
+    @property
+    def memory_usage(self) -> int:
+        # one_shot is not supported by docker-py 5, this waits for a second stats sample
+        stats = self.container.stats(stream=False)
+        return int(stats["memory_stats"].get("usage", 0))
+
+    def confirmation_info(self, root):
+        return self.rpc.call(
+            "confirmation_info",
+            {"root": root, "json_block": "true", "representatives": "true"},
+        )
 
     @property
     def aec(self):
@@ -377,11 +432,7 @@ class NanoNode:
 
     def print_confirmations(self):
         for root in self.aec.confirmations:
-            res = self.rpc.call(
-                "confirmation_info",
-                {"root": root, "json_block": "true", "representatives": "true"},
-            )
-            pprint(res)
+            pprint(self.confirmation_info(root))
 
 
 @title_bar(name="NODES")
@@ -424,10 +475,23 @@ class NodeWalletAccountTuple(NamedTuple):
 
 
 class NanoNet:
-    def __init__(self):
+    def __init__(
+        self,
+        network_profile: Union[NetworkProfile, str] = None,
+        follow_logs=None,
+        ledger_dir=None,
+    ):
         self.runid = str(datetime.now()).replace(" ", "_")
         self.nodes: list[NanoNode] = []
         self.__node_containers = []
+        self.network_profile = network_profile_from(
+            network_profile or os.getenv("NANO_NETWORK_PROFILE")
+        )
+        if follow_logs is None:
+            follow_logs = bool(os.getenv("NANO_FOLLOW_LOGS"))
+        self.log_followers = LogFollowers() if follow_logs else None
+        # when set, node data dirs are kept on the host so the ledger survives between runs
+        self.ledger_dir = ledger_dir or os.getenv("NANO_LEDGER_DIR") or None
 
     @title_bar(name="INITIALIZE NANO TEST NETWORK")
     def setup(self):
@@ -469,12 +533,38 @@ class NanoNet:
                 self.network_name, check_duplicate=True
             )
 
+    def election_inspector(self, interval=1.0, **kwargs) -> ElectionInspector:
+        # shares the node list, so nodes created later are inspected as well
+        return ElectionInspector(self.nodes, interval=interval, **kwargs)
+
+    @property
+    def checkpoint_path(self) -> str:
+        # a chain checkpoint is only valid together with the ledger it was taken from
+        if not self.ledger_dir:
+            return None
+        return os.path.join(self.ledger_dir, "spam_checkpoint.bin")
+
+    @property
+    def events(self) -> BlockEventStore:
+        return self.log_followers.store if self.log_followers else None
+
     @title_bar(name="CLEANUP DOCKER")
     def __cleanup_docker(self):
         for cont in self.client.containers.list():
             if cont.name.startswith(NAME_PREFIX):
                 print("Removing:", cont.name)
-                cont.remove(force=True)
+                try:
+                    if self.ledger_dir:
+                        # stop gracefully so the node flushes the persisted ledger
+                        cont.stop(timeout=30)
+                        if cont.attrs["HostConfig"].get("AutoRemove"):
+                            # removal runs after stop, the name must be free before the node is recreated
+                            cont.wait(condition="removed")
+                            continue
+                    cont.remove(force=True)
+                except docker.errors.NotFound:
+                    # already removed
+                    pass
 
     def create_node(
         self,
@@ -484,9 +574,12 @@ class NanoNet:
         name=None,
         limit_cpus=True,
         track=True,
+        network_profile: Union[NetworkProfile, str] = None,
     ) -> NanoNode:
         additional_cli = os.getenv("NANO_CLI", "")
         node_cli_options = "--network=test --data_path /root/Nano/"
+        if self.log_followers:
+            additional_cli = f"{LOG_CLI_OPTIONS} {additional_cli}"
         node_main_command = f"nano_node daemon {node_cli_options} --config node.peering_port=17075 {additional_cli} -l"
 
         if not do_not_peer:
@@ -510,6 +603,20 @@ class NanoNet:
 
         cpuset_cpus = str(CPUS_PER_NODE) if limit_cpus else None
 
+        ports = {RPC_PORT: host_port}
+        if self.log_followers:
+            # auto-assigned host port, election events are followed over the websocket
+            ports[WEBSOCKET_PORT] = None
+
+        volumes = [
+            f"{os.path.abspath('./node-config/config-node.toml')}:/root/Nano/config-node.toml",
+            f"{os.path.abspath('./node-config/config-rpc.toml')}:/root/Nano/config-rpc.toml",
+        ]
+        if self.ledger_dir:
+            data_dir = os.path.abspath(os.path.join(self.ledger_dir, name))
+            os.makedirs(data_dir, exist_ok=True)
+            volumes.insert(0, f"{data_dir}:/root/Nano")
+
         container = self.client.containers.run(
             image_name,
             node_main_command,
@@ -518,12 +625,10 @@ class NanoNet:
             environment=env,
             name=name,
             network=self.network_name,
-            ports={RPC_PORT: host_port},
-            volumes=[
-                f"{os.path.abspath('./node-config/config-node.toml')}:/root/Nano/config-node.toml",
-                f"{os.path.abspath('./node-config/config-rpc.toml')}:/root/Nano/config-rpc.toml",
-            ],
+            ports=ports,
+            volumes=volumes,
             cpuset_cpus=cpuset_cpus,
+            cap_add=["NET_ADMIN"],
         )
 
         container.reload()  # required to get auto-assigned ports
@@ -531,7 +636,18 @@ class NanoNet:
 
         self.__node_containers.append(container)
 
-        node = NanoNode(container)
+        node = NanoNode(
+            container, network_profile_from(network_profile) or self.network_profile
+        )
+        try:
+            node.apply_impairment()
+        except RuntimeError:
+            # do not leave a running node behind that never joined the net
+            self.__node_containers.remove(container)
+            container.remove(force=True)
+            raise
+        if self.log_followers:
+            self.log_followers.follow(container, node.name, node.websocket_address)
         self.nodes.append(node)
         node.ensure_started()
         print("Started:", node)
@@ -559,6 +675,22 @@ class NanoNet:
     def ensure_all_confirmed(self):
         ensure_confirmed(self.nodes)
 
+    def set_link_profile(
+        self,
+        node_a: NanoNode,
+        node_b: NanoNode,
+        network_profile: Union[NetworkProfile, str],
+        symmetric=True,
+    ):
+        profile = network_profile_from(network_profile)
+
+        node_a.link_profiles[node_b.ip_address] = profile
+        node_a.apply_impairment()
+
+        if symmetric:
+            node_b.link_profiles[node_a.ip_address] = profile
+            node_b.apply_impairment()
+
 
 default_nanonet: NanoNet = None
 
@@ -567,7 +699,9 @@ def generate_random_account() -> Chain:
     seed = nanolib.generate_seed()
     account_id = nanolib.generate_account_id(seed, 0)
     private_key = nanolib.generate_account_private_key(seed, 0)
-    return Chain(account_id, private_key, None)
+    chain = Chain(account_id, private_key, None)
+    chain.precompute_work()
+    return chain
 
 
 def flush_block_queue(
@@ -577,8 +711,16 @@ def flush_block_queue(
     return cnt, hashes
 
 
-def initialize():
-    nanonet = NanoNet()
+def initialize(
+    network_profile: Union[NetworkProfile, str] = None,
+    follow_logs=None,
+    ledger_dir=None,
+):
+    nanonet = NanoNet(
+        network_profile=network_profile,
+        follow_logs=follow_logs,
+        ledger_dir=ledger_dir,
+    )
     nanonet.setup()
 
     global default_nanonet
@@ -0,0 +1,276 @@
+import heapq
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import NamedTuple
+
+from .common import *
+
+ELECTION_SAMPLES = 16
+FINISHED_HISTORY = 10_000
+MEMORY_HISTORY = 8_640
+SLOWEST_COUNT = 20
+
+
+class ElectionSample(NamedTuple):
+    timestamp: float
+    voters: int
+    total_tally: int
+    final_tally: int
+    blocks: int
+    participation: float
+
+
+class MemorySample(NamedTuple):
+    timestamp: float
+    objects_bytes: int
+    container_bytes: int
+    active_elections: int
+
+
+class Election:
+    __slots__ = ["node", "root", "first_seen", "last_seen", "winner", "samples"]
+
+    def __init__(self, node, root, timestamp):
+        self.node = node
+        self.root = root
+        self.first_seen = timestamp
+        self.last_seen = timestamp
+        self.winner = None
+        self.samples: deque[ElectionSample] = deque(maxlen=ELECTION_SAMPLES)
+
+    def __lt__(self, other):
+        return self.age < other.age
+
+    def __str__(self):
+        last = self.samples[-1] if self.samples else None
+        voters = last.voters if last else "?"
+        participation = f"{last.participation:.1%}" if last else "?"
+        return f"[{self.node: <24} | root: {self.root[:16]}.. | age: {self.age: >8.2f}s | voters: {voters: >4} | participation: {participation: >6}]"
+
+    @property
+    def age(self) -> float:
+        return self.last_seen - self.first_seen
+
+
+def objects_bytes(stats) -> int:
+    """
+    Sum of count * size over all leaves of an `objects` stats tree.
+    """
+    if not isinstance(stats, dict):
+        return 0
+    if "count" in stats and "size" in stats:
+        return int(stats["count"]) * int(stats["size"])
+    return sum(objects_bytes(value) for value in stats.values())
+
+
+class ElectionInspector:
+    """
+    Periodically samples active elections and memory usage of all nodes in a background thread.
+    All history is kept in fixed size buffers, so it can be left running for long soak tests.
+    """
+
+    def __init__(
+        self,
+        nodes,
+        interval=1.0,
+        max_roots=256,
+        max_workers=32,
+        finished_history=FINISHED_HISTORY,
+        memory_history=MEMORY_HISTORY,
+        slowest_count=SLOWEST_COUNT,
+    ):
+        self.nodes = nodes
+        self.interval = interval
+        self.max_roots = max_roots
+        self.slowest_count = slowest_count
+        self.active: dict[tuple, Election] = {}
+        self.finished: deque[Election] = deque(maxlen=finished_history)
+        self.memory: dict[str, deque[MemorySample]] = {}
+        self.memory_history = memory_history
+        # first sample per node, the ring buffer alone would forget the baseline
+        self.__first_memory: dict[str, MemorySample] = {}
+        self.__slowest: list[Election] = []
+        self.max_workers = max_workers
+        self.__node_executor = None
+        self.__executor = None
+        self.__lock = threading.Lock()
+        self.__stop = threading.Event()
+        self.__thread = None
+
+    def __start_executors(self):
+        # separate pools, node samplers block on confirmation_info requests
+        if not self.__node_executor:
+            self.__node_executor = ThreadPoolExecutor(thread_name_prefix="inspect_node")
+        if not self.__executor:
+            self.__executor = ThreadPoolExecutor(max_workers=self.max_workers)
+
+    def start(self):
+        self.__start_executors()
+        self.__stop.clear()
+        self.__thread = threading.Thread(
+            target=self.__run, name="election_inspector", daemon=True
+        )
+        self.__thread.start()
+
+    def stop(self):
+        self.__stop.set()
+        if self.__thread:
+            self.__thread.join()
+            self.__thread = None
+
+        for executor in (self.__node_executor, self.__executor):
+            if executor:
+                executor.shutdown(wait=True)
+        self.__node_executor = None
+        self.__executor = None
+
+    def __run(self):
+        while not self.__stop.is_set():
+            start = time.time()
+            try:
+                self.sample()
+            except Exception as e:
+                print("Election inspector sample failed:", e)
+            self.__stop.wait(max(0, self.interval - (time.time() - start)))
+
+    def sample(self):
+        self.__start_executors()
+        nodes = list(self.nodes)
+        for node, memory in zip(
+            nodes, self.__node_executor.map(self.__try_sample_node, nodes)
+        ):
+            if not memory:
+                continue
+            with self.__lock:
+                self.__first_memory.setdefault(node.name, memory)
+                self.memory.setdefault(
+                    node.name, deque(maxlen=self.memory_history)
+                ).append(memory)
+
+    def __try_sample_node(self, node) -> MemorySample:
+        # a failing node must not abort the sample of all the others
+        try:
+            return self.__sample_node(node)
+        except Exception as e:
+            print("Election inspector failed to sample:", node.name, e)
+            return None
+
+    def __sample_node(self, node) -> MemorySample:
+        timestamp = time.time()
+        aec = node.aec
+        online_stake = int(node.rpc.call("confirmation_quorum")["online_stake_total"])
+
+        roots = set(aec.confirmations)
+        with self.__lock:
+            for key in [key for key in self.active if key[0] == node.name]:
+                if key[1] not in roots:
+                    self.__finish(self.active.pop(key))
+            for root in roots:
+                election = self.active.get((node.name, root))
+                if not election:
+                    election = Election(node.name, root, timestamp)
+                    self.active[(node.name, root)] = election
+                election.last_seen = timestamp
+            # the oldest elections are the interesting ones, only those get confirmation_info
+            elections = sorted(
+                (self.active[(node.name, root)] for root in roots),
+                key=lambda election: election.first_seen,
+            )[: self.max_roots]
+
+        for election, info in zip(
+            elections,
+            self.__executor.map(
+                lambda election: self.__confirmation_info(node, election.root),
+                elections,
+            ),
+        ):
+            if info:
+                self.__update(election, info, online_stake, timestamp)
+
+        return MemorySample(
+            timestamp,
+            objects_bytes(node.stat_objects),
+            node.memory_usage,
+            len(roots),
+        )
+
+    @staticmethod
+    def __confirmation_info(node, root):
+        try:
+            return node.confirmation_info(root)
+        except Exception:
+            # election ended between confirmation_active and confirmation_info
+            return None
+
+    @staticmethod
+    def __update(election: Election, info, online_stake, timestamp):
+        total_tally = int(info.get("total_tally", 0))
+        election.winner = info.get("last_winner")
+        election.samples.append(
+            ElectionSample(
+                timestamp,
+                int(info.get("voters", 0)),
+                total_tally,
+                int(info.get("final_tally", 0)),
+                len(info.get("blocks") or {}),
+                total_tally / online_stake if online_stake else 0,
+            )
+        )
+
+    def __finish(self, election: Election):
+        self.finished.append(election)
+        if len(self.__slowest) < self.slowest_count:
+            heapq.heappush(self.__slowest, election)
+        elif election.age > self.__slowest[0].age:
+            heapq.heapreplace(self.__slowest, election)
+
+    def slowest_elections(self, count=None) -> list[Election]:
+        with self.__lock:
+            elections = list(self.__slowest) + list(self.active.values())
+        return heapq.nlargest(count or self.slowest_count, elections)
+
+    def latest_memory(self) -> dict[str, tuple[MemorySample, MemorySample]]:
+        """
+        First and latest memory sample per node.
+        """
+        with self.__lock:
+            return {
+                name: (self.__first_memory[name], samples[-1])
+                for name, samples in self.memory.items()
+            }
+
+    def memory_growth(self) -> dict:
+        """
+        Growth of object and container memory per node since the first sample, in bytes per hour.
+        """
+        growth = {}
+        for name, (first, last) in self.latest_memory().items():
+            hours = (last.timestamp - first.timestamp) / 3600
+            if hours <= 0:
+                continue
+            growth[name] = (
+                (last.objects_bytes - first.objects_bytes) / hours,
+                (last.container_bytes - first.container_bytes) / hours,
+            )
+        return growth
+
+    @title_bar(name="ELECTION INSPECTOR")
+    def print_summary(self, count=None):
+        with self.__lock:
+            active, finished = len(self.active), len(self.finished)
+        print("Active:", active, "finished:", finished)
+
+        print("Slowest elections:")
+        for election in self.slowest_elections(count):
+            print(election)
+
+        print("Memory growth per hour:")
+        growth = self.memory_growth()
+        latest = self.latest_memory()
+        for name, (objects_growth, container_growth) in growth.items():
+            last = latest[name][1]
+            print(
+                f"[{name: <24} | objects: {last.objects_bytes / 2**20: >9.1f} MiB ({objects_growth / 2**20: >+8.1f}) | container: {last.container_bytes / 2**20: >9.1f} MiB ({container_growth / 2**20: >+8.1f})]"
+            )
@@ -0,0 +1,290 @@
+import json
+import re
+import sys
+import threading
+from collections import deque
+from datetime import datetime
+from enum import IntEnum
+from typing import NamedTuple
+
+import websocket
+
+from .common import *
+
+HASH_RE = re.compile(rb"[0-9A-F]{64}")
+WEBSOCKET_PORT = 17078
+
+# node cli options that make the node write the parsed events to stderr
+LOG_CLI_OPTIONS = " ".join(
+    [
+        "--config node.logging.log_to_cerr=true",
+        "--config node.logging.single_line_record=true",
+        "--config node.logging.ledger=true",
+        "--config node.logging.vote=true",
+        f"--config node.websocket.port={WEBSOCKET_PORT}",
+    ]
+)
+
+
+class EventKind(IntEnum):
+    BLOCK_PROCESSED = 0
+    VOTE_RECEIVED = 1
+    ELECTION_STARTED = 2
+    ELECTION_CONFIRMED = 3
+
+
+# each pattern captures the part of the line that holds the block hash(es) of the event
+LOG_EVENT_PATTERNS = {
+    # block_processor, node.logging.ledger
+    EventKind.BLOCK_PROCESSED: re.compile(rb"Processing block ([0-9A-F]{64})"),
+    # vote_processor, node.logging.vote
+    EventKind.VOTE_RECEIVED: re.compile(rb"Vote from: \S+ .*?block\(s\): (.*?) status"),
+}
+
+# the node log has no per hash line for elections, those events come from the websocket topics
+WEBSOCKET_TOPICS = {
+    "started_election": EventKind.ELECTION_STARTED,
+    "confirmation": EventKind.ELECTION_CONFIRMED,
+}
+WEBSOCKET_TOPIC_OPTIONS = {
+    "confirmation": {"confirmation_type": "all", "include_block": "false"},
+}
+
+
+class BlockEvent(NamedTuple):
+    timestamp: float
+    node: str
+    kind: EventKind
+    block_hash: bytes
+
+
+def parse_docker_timestamp(raw: bytes) -> float:
+    # docker uses RFC3339 with nanoseconds, eg. 2022-09-01T12:00:00.123456789Z
+    raw = raw.decode().rstrip("Z")
+    if "." in raw:
+        base, fraction = raw.split(".", 1)
+        raw = f"{base}.{fraction[:6]:0<6}"
+    return datetime.fromisoformat(raw + "+00:00").timestamp()
+
+
+def parse_log_line(line: bytes, patterns=LOG_EVENT_PATTERNS):
+    """
+    Parse a docker log line with timestamp prefix into (timestamp, kind, [hashes]) tuples.
+    """
+    raw_timestamp, _, message = line.partition(b" ")
+    for kind, pattern in patterns.items():
+        match = pattern.search(message)
+        if match:
+            hashes = HASH_RE.findall(b" ".join(g for g in match.groups() if g))
+            if hashes:
+                yield parse_docker_timestamp(raw_timestamp), kind, hashes
+
+
+def parse_websocket_message(message):
+    """
+    Parse a node websocket message into a (timestamp, kind, [hashes]) tuple, None for other messages.
+    """
+    data = json.loads(message)
+    kind = WEBSOCKET_TOPICS.get(data.get("topic"))
+    if kind is None:
+        return None
+    # node time in milliseconds
+    timestamp = int(data["time"]) / 1000
+    return timestamp, kind, [data["message"]["hash"].encode()]
+
+
+class BlockEventStore:
+    """
+    Thread safe store of block events indexed by block hash and by second.
+    Holds at most `max_events`, the oldest events are evicted first.
+    """
+
+    def __init__(self, max_events=1_000_000):
+        self.__lock = threading.Lock()
+        self.__events = deque()
+        # events are appended in insertion order, so the evicted event is always the first in its buckets
+        self.__by_hash: dict[bytes, deque[BlockEvent]] = {}
+        self.__by_second: dict[int, deque[BlockEvent]] = {}
+        self.max_events = max_events
+        self.evicted = 0
+
+    def __len__(self):
+        return len(self.__events)
+
+    def add(self, timestamp: float, node: str, kind: EventKind, block_hash):
+        if isinstance(block_hash, str):
+            block_hash = bytes.fromhex(block_hash)
+        elif len(block_hash) == 64:
+            block_hash = bytes.fromhex(block_hash.decode())
+
+        event = BlockEvent(timestamp, sys.intern(node), kind, block_hash)
+
+        with self.__lock:
+            if len(self.__events) >= self.max_events:
+                self.__evict(self.__events.popleft())
+            self.__events.append(event)
+            self.__by_hash.setdefault(event.block_hash, deque()).append(event)
+            self.__by_second.setdefault(int(timestamp), deque()).append(event)
+
+        return event
+
+    def __evict(self, event: BlockEvent):
+        self.evicted += 1
+        for index, key in (
+            (self.__by_hash, event.block_hash),
+            (self.__by_second, int(event.timestamp)),
+        ):
+            events = index[key]
+            events.popleft()
+            if not events:
+                del index[key]
+
+    def timeline(self, block_hash) -> list[BlockEvent]:
+        if isinstance(block_hash, str):
+            block_hash = bytes.fromhex(block_hash)
+        with self.__lock:
+            events = list(self.__by_hash.get(block_hash, ()))
+        return sorted(events)
+
+    def between(self, start: float, end: float) -> list[BlockEvent]:
+        with self.__lock:
+            events = [
+                event
+                for second in range(int(start), int(end) + 1)
+                for event in self.__by_second.get(second, ())
+                if start <= event.timestamp <= end
+            ]
+        return sorted(events)
+
+    def block_hashes(self) -> list[str]:
+        with self.__lock:
+            return [block_hash.hex().upper() for block_hash in self.__by_hash]
+
+
+class LogFollower(threading.Thread):
+    """
+    Follows the log stream of a single container in a background thread.
+    """
+
+    def __init__(self, container, node_name, store: BlockEventStore, patterns=None):
+        super().__init__(name=f"log_follower_{node_name}", daemon=True)
+        self.container = container
+        self.node_name = node_name
+        self.store = store
+        self.patterns = patterns or LOG_EVENT_PATTERNS
+        self.lines = 0
+        self.__stream = None
+
+    def run(self):
+        self.__stream = self.container.logs(stream=True, follow=True, timestamps=True)
+        buffer = b""
+        try:
+            for chunk in self.__stream:
+                buffer += chunk
+                *lines, buffer = buffer.split(b"\n")
+                for line in lines:
+                    self.__process_line(line)
+        except Exception as e:
+            # container removed or stream closed
+            print("Stopped following logs:", self.node_name, e)
+
+    def __process_line(self, line: bytes):
+        self.lines += 1
+        for timestamp, kind, hashes in parse_log_line(line, self.patterns):
+            for block_hash in hashes:
+                self.store.add(timestamp, self.node_name, kind, block_hash)
+
+    def stop(self):
+        if self.__stream:
+            self.__stream.close()
+
+
+class WebsocketFollower(threading.Thread):
+    """
+    Follows the election topics of a single node websocket in a background thread.
+    """
+
+    def __init__(self, url, node_name, store: BlockEventStore, connect_tries=30):
+        super().__init__(name=f"websocket_follower_{node_name}", daemon=True)
+        self.url = url
+        self.node_name = node_name
+        self.store = store
+        self.connect_tries = connect_tries
+        self.messages = 0
+        self.__ws = None
+        self.__stopped = threading.Event()
+
+    def __connect(self):
+        # the websocket server comes up a moment after the container starts
+        for n in range(self.connect_tries):
+            try:
+                return websocket.create_connection(self.url)
+            except (OSError, websocket.WebSocketException):
+                if n + 1 == self.connect_tries or self.__stopped.wait(1):
+                    raise
+
+    def run(self):
+        try:
+            self.__ws = self.__connect()
+            for topic in WEBSOCKET_TOPICS:
+                subscribe = {"action": "subscribe", "topic": topic}
+                if topic in WEBSOCKET_TOPIC_OPTIONS:
+                    subscribe["options"] = WEBSOCKET_TOPIC_OPTIONS[topic]
+                self.__ws.send(json.dumps(subscribe))
+
+            while not self.__stopped.is_set():
+                self.__process_message(self.__ws.recv())
+        except Exception as e:
+            # node stopped or follower closed
+            print("Stopped following websocket:", self.node_name, e)
+
+    def __process_message(self, message):
+        self.messages += 1
+        event = parse_websocket_message(message)
+        if event:
+            timestamp, kind, hashes = event
+            for block_hash in hashes:
+                self.store.add(timestamp, self.node_name, kind, block_hash)
+
+    def stop(self):
+        self.__stopped.set()
+        if self.__ws:
+            self.__ws.close()
+
+
+class LogFollowers:
+    def __init__(self, max_events=1_000_000, patterns=None):
+        self.store = BlockEventStore(max_events)
+        self.patterns = patterns
+        self.followers: list[threading.Thread] = []
+
+    def follow(self, container, node_name, websocket_url=None):
+        follower = LogFollower(container, node_name, self.store, self.patterns)
+        follower.start()
+        self.followers.append(follower)
+
+        if websocket_url:
+            follower = WebsocketFollower(websocket_url, node_name, self.store)
+            follower.start()
+            self.followers.append(follower)
+
+    def stop(self):
+        for follower in self.followers:
+            follower.stop()
+        self.followers = []
+
+    def timeline(self, block_hash) -> list[BlockEvent]:
+        return self.store.timeline(block_hash)
+
+    @title_bar(name="BLOCK TIMELINE")
+    def print_timeline(self, block_hash):
+        events = self.timeline(block_hash)
+        if not events:
+            print("No events for:", block_hash)
+            return
+
+        start = events[0].timestamp
+        for event in events:
+            print(
+                f"[+{(event.timestamp - start) * 1000: >10.3f} ms | {event.node: <24} | {event.kind.name}]"
+            )
@@ -0,0 +1,127 @@
+from dataclasses import dataclass
+from typing import Union
+
+# traffic leaving the container from these ports (rpc, websocket) is never impaired, so calls
+# made by the harness and the prometheus exporter and followed events are not slowed down
+UNIMPAIRED_SPORTS = (17076, 17078)
+IMPAIRED_DEVICE = "eth0"
+HTB_RATE = "100gbit"
+
+
+@dataclass(frozen=True)
+class NetworkProfile:
+    """
+    Egress impairment applied with `tc netem` inside a node container.
+    Latency and jitter are one-way, so a link impaired on both ends has a round trip of 2x latency.
+    """
+
+    latency_ms: float = 0
+    jitter_ms: float = 0
+    loss_pct: float = 0
+    rate_mbit: float = 0
+
+    def netem_args(self) -> str:
+        args = []
+        if self.latency_ms or self.jitter_ms:
+            args.append(
+                f"delay {self.latency_ms}ms {self.jitter_ms}ms distribution normal"
+            )
+        if self.loss_pct:
+            args.append(f"loss {self.loss_pct}%")
+        if self.rate_mbit:
+            args.append(f"rate {self.rate_mbit}mbit")
+        return " ".join(args)
+
+    @property
+    def is_noop(self) -> bool:
+        return not self.netem_args()
+
+
+NETWORK_PROFILES = {
+    "none": NetworkProfile(),
+    "same-DC": NetworkProfile(latency_ms=0.5, jitter_ms=0.1, rate_mbit=10000),
+    "same-region": NetworkProfile(
+        latency_ms=5, jitter_ms=1, loss_pct=0.01, rate_mbit=1000
+    ),
+    "cross-region": NetworkProfile(
+        latency_ms=75, jitter_ms=10, loss_pct=0.1, rate_mbit=100
+    ),
+    "intercontinental": NetworkProfile(
+        latency_ms=150, jitter_ms=20, loss_pct=0.5, rate_mbit=50
+    ),
+    "lossy": NetworkProfile(latency_ms=40, jitter_ms=20, loss_pct=3, rate_mbit=20),
+}
+
+
+def network_profile_from(profile: Union[NetworkProfile, str, None]) -> NetworkProfile:
+    if profile is None or isinstance(profile, NetworkProfile):
+        return profile
+    if profile not in NETWORK_PROFILES:
+        raise ValueError(
+            f"Unknown network profile: {profile} (available: {', '.join(NETWORK_PROFILES)})"
+        )
+    return NETWORK_PROFILES[profile]
+
+
+def tc_commands(
+    default: NetworkProfile = None, links: dict = None, device=IMPAIRED_DEVICE
+) -> list:
+    """
+    Build the `tc` commands that impair all egress traffic with `default` and traffic towards
+    specific peer ips with the profiles in `links` ({ip: NetworkProfile}).
+    Class 1:1 is left unimpaired for rpc and websocket traffic, 1:2 carries the default profile
+    and every link gets its own class starting at 1:10.
+    """
+    links = links or {}
+    commands = [
+        f"tc qdisc replace dev {device} root handle 1: htb default 2",
+        f"tc class add dev {device} parent 1: classid 1:1 htb rate {HTB_RATE}",
+        f"tc class add dev {device} parent 1: classid 1:2 htb rate {HTB_RATE}",
+    ]
+    for sport in UNIMPAIRED_SPORTS:
+        commands.append(
+            f"tc filter add dev {device} protocol ip parent 1: prio 1 u32 match ip sport {sport} 0xffff flowid 1:1"
+        )
+
+    if default and not default.is_noop:
+        commands.append(
+            f"tc qdisc add dev {device} parent 1:2 handle 20: netem {default.netem_args()}"
+        )
+
+    for n, (ip, profile) in enumerate(links.items(), start=10):
+        commands.append(
+            f"tc class add dev {device} parent 1: classid 1:{n} htb rate {HTB_RATE}"
+        )
+        if not profile.is_noop:
+            commands.append(
+                f"tc qdisc add dev {device} parent 1:{n} handle {n}0: netem {profile.netem_args()}"
+            )
+        commands.append(
+            f"tc filter add dev {device} protocol ip parent 1: prio 2 u32 match ip dst {ip}/32 flowid 1:{n}"
+        )
+
+    return commands
+
+
+def apply_impairment(container, default: NetworkProfile = None, links: dict = None):
+    """
+    Replace the traffic control setup of a running container.
+    The container needs the NET_ADMIN capability and `tc` (iproute2) in its image.
+    """
+    container.exec_run(f"tc qdisc del dev {IMPAIRED_DEVICE} root")
+
+    if (not default or default.is_noop) and not links:
+        return
+
+    exit_code, _ = container.exec_run("tc -V")
+    if exit_code != 0:
+        raise RuntimeError(
+            f"Failed to apply network impairment on {container.name}: `tc` not found, the node image needs iproute2"
+        )
+
+    for command in tc_commands(default, links):
+        exit_code, output = container.exec_run(command)
+        if exit_code != 0:
+            raise RuntimeError(
+                f"Failed to apply network impairment on {container.name}: {command}: {output.decode().strip()}"
+            )
@@ -0,0 +1,186 @@
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import NamedTuple
+
+import dotenv
+import nanolib
+
+NODE_ENV_PATH = "node.env"
+MAX_PENDING_WORK = 65536
+
+
+def parse_threshold(value: str) -> str:
+    # node.env uses 0x prefixed values, nanolib expects 16 hex characters
+    return f"{int(value, 16):016x}"
+
+
+class WorkThresholds(NamedTuple):
+    """
+    The harness does not track account epochs. Blocks of epoch 0/1 accounts are checked against
+    epoch_1, blocks of epoch 2 accounts against epoch_2 or epoch_2_receive, so the higher value is used.
+    """
+
+    epoch_1: str
+    epoch_2: str
+    epoch_2_receive: str
+
+    @property
+    def send(self) -> str:
+        return max(self.epoch_1, self.epoch_2)
+
+    @property
+    def receive(self) -> str:
+        return max(self.epoch_1, self.epoch_2_receive)
+
+    @property
+    def lookahead(self) -> str:
+        # the type of the next block is not known in advance, work meeting the higher threshold is valid for both
+        return max(self.send, self.receive)
+
+    @property
+    def trivial(self) -> bool:
+        return int(self.lookahead, 16) == 0
+
+
+def load_work_thresholds(env_path=NODE_ENV_PATH) -> WorkThresholds:
+    node_env = dotenv.dotenv_values(env_path)
+    return WorkThresholds(
+        epoch_1=parse_threshold(node_env["NANO_TEST_EPOCH_1"]),
+        epoch_2=parse_threshold(node_env["NANO_TEST_EPOCH_2"]),
+        epoch_2_receive=parse_threshold(node_env["NANO_TEST_EPOCH_2_RECV"]),
+    )
+
+
+class PendingWork(NamedTuple):
+    root: str
+    difficulty: str
+    future: Future
+
+
+class WorkGenerator:
+    """
+    Generates proof of work on a process pool, by default one process per core.
+    Work for the next block of an account is precomputed as soon as its frontier is known,
+    since the work root of the next block is the current frontier hash.
+    """
+
+    def __init__(
+        self, thresholds: WorkThresholds, processes=None, max_pending=MAX_PENDING_WORK
+    ):
+        self.thresholds = thresholds
+        self.processes = processes or os.cpu_count()
+        self.max_pending = max_pending
+        self.hits = 0
+        self.misses = 0
+        self.__executor = None
+        self.__lock = threading.Lock()
+        self.__pending: OrderedDict[str, PendingWork] = OrderedDict()
+
+    def __len__(self):
+        return len(self.__pending)
+
+    def __str__(self):
+        return f"[work | processes: {self.processes} | pending: {len(self.__pending): >6} | hits: {self.hits: >9} | misses: {self.misses: >9}]"
+
+    @property
+    def executor(self) -> ProcessPoolExecutor:
+        if not self.__executor:
+            self.__executor = ProcessPoolExecutor(max_workers=self.processes)
+        return self.__executor
+
+    def precompute(self, account_id, root):
+        # not worth the inter-process round trip when any nonce is valid
+        if self.thresholds.trivial:
+            return
+
+        difficulty = self.thresholds.lookahead
+
+        with self.__lock:
+            pending = self.__pending.get(account_id)
+            if pending and pending.root == root:
+                return
+            if pending:
+                pending.future.cancel()
+
+            future = self.executor.submit(nanolib.solve_work, root, difficulty)
+            self.__pending[account_id] = PendingWork(root, difficulty, future)
+            self.__pending.move_to_end(account_id)
+
+            while len(self.__pending) > self.max_pending:
+                _, dropped = self.__pending.popitem(last=False)
+                dropped.future.cancel()
+
+    def work(self, account_id, root, difficulty) -> str:
+        with self.__lock:
+            pending = self.__pending.pop(account_id, None)
+
+        if (
+            pending
+            and pending.root == root
+            and int(pending.difficulty, 16) >= int(difficulty, 16)
+            and not pending.future.cancelled()
+        ):
+            with self.__lock:
+                self.hits += 1
+            return pending.future.result()
+
+        if pending:
+            pending.future.cancel()
+
+        with self.__lock:
+            self.misses += 1
+        return nanolib.solve_work(root, difficulty)
+
+    def discard(self, account_id):
+        with self.__lock:
+            pending = self.__pending.pop(account_id, None)
+        if pending:
+            pending.future.cancel()
+
+    def shutdown(self):
+        with self.__lock:
+            for pending in self.__pending.values():
+                pending.future.cancel()
+            self.__pending.clear()
+
+        if self.__executor:
+            self.__executor.shutdown(wait=False, cancel_futures=True)
+            self.__executor = None
+
+
+__default_work_generator: WorkGenerator = None
+__work_processes = None
+
+
+def total_work_processes() -> int:
+    return int(os.getenv("NANO_WORK_PROCESSES", 0)) or os.cpu_count()
+
+
+def work_processes_share(jobs) -> int:
+    """
+    Pool size for each of `jobs` processes generating work at the same time, so together they use all cores once.
+    """
+    return max(1, total_work_processes() // jobs)
+
+
+def set_work_processes(processes):
+    """
+    Resize the pool of the default generator of this process, call it first thing in a spam worker process.
+    """
+    global __default_work_generator, __work_processes
+    __work_processes = processes
+    if __default_work_generator:
+        __default_work_generator.shutdown()
+        __default_work_generator = None
+
+
+def default_work_generator() -> WorkGenerator:
+    global __default_work_generator
+    if not __default_work_generator:
+        __default_work_generator = WorkGenerator(
+            load_work_thresholds(),
+            processes=__work_processes or total_work_processes(),
+        )
+    return __default_work_generator
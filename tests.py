@@ -1,16 +1,44 @@
+import os
+import tempfile
 import time
 import unittest
+from unittest import mock
 from cmath import nan
 from collections import deque
 from decimal import *
-from itertools import chain
+from itertools import chain, islice
 
+import nanolib
 from joblib import Parallel, delayed
 
 import nanotest
 import nanotest.setup
+from nanotest.checkpoint import (
+    CHECKPOINT_RECORD,
+    ChainState,
+    Frontier,
+    checkpoint_count,
+    live_chain_states,
+    load_checkpoint,
+    save_checkpoint,
+)
 from nanotest.common import *
 from nanotest.docker import NanoNode, NanoNodeRPC
+from nanotest.elections import ElectionInspector, objects_bytes
+from nanotest.logs import (
+    BlockEventStore,
+    EventKind,
+    parse_log_line,
+    parse_websocket_message,
+)
+from nanotest.network import (
+    NETWORK_PROFILES,
+    NetworkProfile,
+    apply_impairment,
+    network_profile_from,
+    tc_commands,
+)
+from nanotest.workgen import WorkGenerator, WorkThresholds, load_work_thresholds
 
 
 @title_bar(name="INITIALIZE REPRESENTATIVES")
@@ -40,8 +68,10 @@ def distribute_voting_weight_uniform(nanonet, count, reserved):
     return reps
 
 
-def __spam_bin_tree_impl(rpc_address, chain_root, count):
+def __spam_bin_tree_impl(rpc_address, chain_root, count, work_processes):
+    nanotest.set_work_processes(work_processes)
     node = NanoNodeRPC(rpc_address)
+    chain_root.precompute_work()
     q = deque([chain_root])
 
     for i in range(count):
@@ -51,7 +81,8 @@ def __spam_bin_tree_impl(rpc_address, chain_root, count):
 
         half_balance = int(r.balance / 2)
         a.receive(r.send(a, half_balance))
-        b.receive(r.send(b, half_balance))
+        # last block of r, no look-ahead
+        b.receive(r.send(b, half_balance, precompute=False))
 
         q.append(a)
         q.append(b)
@@ -60,6 +91,10 @@ def __spam_bin_tree_impl(rpc_address, chain_root, count):
             print("Progress:", i)
 
     nanotest.flush_block_queue(node)
+    # joblib reuses worker processes, unused look-ahead must not keep the cores busy
+    nanotest.default_work_generator().shutdown()
+
+    return [ChainState.from_chain(account) for account in q]
 
 
 @title_bar(name="SPAM BIN TREE")
@@ -68,18 +103,87 @@ def spam_bin_tree(node, spam_raw, source_account, spam_concurrent, spam_count):
 
     spam_roots = [nanotest.generate_random_account() for _ in range(spam_concurrent)]
     for spam_root in spam_roots:
-        spam_root.receive(source_account.send(spam_root, spam_raw))
+        # the roots continue in worker processes, look-ahead in this one would be lost
+        spam_root.receive(source_account.send(spam_root, spam_raw), precompute=False)
 
     nanotest.flush_block_queue(node)
 
-    Parallel(n_jobs=spam_concurrent)(
+    results = Parallel(n_jobs=spam_concurrent)(
         delayed(__spam_bin_tree_impl)(
             rpc_address=node.rpc_address,
             chain_root=spam_root,
             count=spam_count,
+            work_processes=nanotest.work_processes_share(spam_concurrent),
         )
         for spam_root in spam_roots
     )
+    return list(chain.from_iterable(results))
+
+
+def __spam_steady_state_impl(rpc_address, states, count, work_processes):
+    nanotest.set_work_processes(work_processes)
+    node = NanoNodeRPC(rpc_address)
+    chains = [state.to_chain() for state in states]
+
+    for i in range(count):
+        a = chains[i % len(chains)]
+        b = chains[(i + 1) % len(chains)]
+
+        b.receive(a.send(b, 1))
+
+        if i % 100 == 0:
+            print("Progress:", i)
+
+    nanotest.flush_block_queue(node)
+    nanotest.default_work_generator().shutdown()
+
+    return [ChainState.from_chain(account) for account in chains]
+
+
+@title_bar(name="SPAM STEADY STATE")
+def spam_steady_state(node, states, spam_concurrent, spam_count):
+    # every chain belongs to exactly one worker so frontiers never conflict
+    partitions = [states[n::spam_concurrent] for n in range(spam_concurrent)]
+
+    results = Parallel(n_jobs=spam_concurrent)(
+        delayed(__spam_steady_state_impl)(
+            rpc_address=node.rpc_address,
+            states=partition,
+            count=spam_count,
+            work_processes=nanotest.work_processes_share(spam_concurrent),
+        )
+        for partition in partitions
+    )
+    return list(chain.from_iterable(results))
+
+
+def load_spam_checkpoint(node, checkpoint_path, limit):
+    if not checkpoint_path or not os.path.exists(checkpoint_path):
+        return []
+
+    print(
+        "Checkpoint:", checkpoint_path, "accounts:", checkpoint_count(checkpoint_path)
+    )
+    states = live_chain_states(node, load_checkpoint(checkpoint_path))
+    return list(islice(states, limit))
+
+
+def spam_resumable(
+    node, spam_raw, source_account, spam_concurrent, spam_count, checkpoint_path
+):
+    # resuming only makes sense against a ledger that still contains the checkpointed frontiers
+    states = load_spam_checkpoint(node, checkpoint_path, spam_concurrent * spam_count)
+
+    if len(states) >= spam_concurrent * 2:
+        states = spam_steady_state(node, states, spam_concurrent, spam_count)
+    else:
+        states = spam_bin_tree(
+            node, spam_raw, source_account, spam_concurrent, spam_count
+        )
+
+    if checkpoint_path:
+        cnt = save_checkpoint(checkpoint_path, states)
+        print("Saved checkpoint:", checkpoint_path, "accounts:", cnt)
 
 
 class TestBinSpam(unittest.TestCase):
@@ -99,12 +203,13 @@ class TestBinSpam(unittest.TestCase):
 
         node1 = nanonet.create_node(limit_cpus=False)
 
-        spam_bin_tree(
+        spam_resumable(
             node1,
             spam_raw,
             nanonet.genesis.account,
             spam_concurrent,
             spam_count,
+            nanonet.checkpoint_path,
         )
 
         nanonet.ensure_all_confirmed()
@@ -112,5 +217,467 @@ class TestBinSpam(unittest.TestCase):
         pass
 
 
+class TestCheckpoint(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.tmp_dir.name, "checkpoint.bin")
+
+        self.chains = [nanotest.generate_random_account() for _ in range(3)]
+        for n, account in enumerate(self.chains):
+            account.frontier = Frontier(
+                f"{n + 1:064X}", 2**100 + n, nanotest.DEFAULT_REPR
+            )
+
+    def tearDown(self):
+        self.tmp_dir.cleanup()
+
+    def test_round_trip(self):
+        states = [ChainState.from_chain(account) for account in self.chains]
+        self.assertEqual(save_checkpoint(self.path, states), 3)
+        self.assertEqual(checkpoint_count(self.path), 3)
+
+        loaded = list(load_checkpoint(self.path))
+        self.assertEqual(loaded, states)
+
+        source = loaded[0].to_chain()
+        self.assertEqual(source.account_id, self.chains[0].account_id)
+        self.assertEqual(source.private_key, self.chains[0].private_key)
+
+        queue = nanotest.BlockQueue()
+        block = source.send(loaded[1].to_chain(), 10, block_queue=queue)
+
+        self.assertEqual(block.block_nlib.previous, f"{1:064X}")
+        self.assertEqual(block.balance, 2**100 - 10)
+        self.assertEqual(block.send_amount, 10)
+        self.assertEqual(
+            nanolib.get_account_public_key(account_id=block.representative),
+            nanolib.get_account_public_key(account_id=nanotest.DEFAULT_REPR),
+        )
+        block.block_nlib.verify_signature()
+        self.assertEqual(queue.pop_all(), [block])
+
+    def test_truncated(self):
+        states = [ChainState.from_chain(account) for account in self.chains]
+        save_checkpoint(self.path, states)
+        with open(self.path, "r+b") as f:
+            f.truncate(os.path.getsize(self.path) - CHECKPOINT_RECORD.size // 2)
+
+        loaded = load_checkpoint(self.path)
+        self.assertEqual(next(loaded), states[0])
+        self.assertEqual(next(loaded), states[1])
+        with self.assertRaisesRegex(ValueError, "Truncated"):
+            next(loaded)
+
+    def test_bad_magic(self):
+        with open(self.path, "wb") as f:
+            f.write(b"XXXX\x01" + bytes(CHECKPOINT_RECORD.size))
+
+        with self.assertRaisesRegex(ValueError, "Not a chain checkpoint"):
+            list(load_checkpoint(self.path))
+
+
+class TestNetworkProfiles(unittest.TestCase):
+    PEER_IP = "172.18.0.3"
+    OTHER_PEER_IP = "172.18.0.4"
+
+    def assertUnimpairedRpc(self, commands):
+        self.assertIn(
+            "tc filter add dev eth0 protocol ip parent 1: prio 1 u32 match ip sport 17076 0xffff flowid 1:1",
+            commands,
+        )
+
+    def test_profile_from(self):
+        self.assertIsNone(network_profile_from(None))
+        self.assertIs(
+            network_profile_from("cross-region"), NETWORK_PROFILES["cross-region"]
+        )
+        profile = NetworkProfile(latency_ms=10)
+        self.assertIs(network_profile_from(profile), profile)
+
+    def test_unknown_profile(self):
+        with self.assertRaisesRegex(ValueError, "Unknown network profile: mars"):
+            network_profile_from("mars")
+
+    def test_default_only(self):
+        commands = tc_commands(NetworkProfile(latency_ms=75, jitter_ms=10, loss_pct=1))
+        self.assertEqual(
+            commands[0], "tc qdisc replace dev eth0 root handle 1: htb default 2"
+        )
+        self.assertUnimpairedRpc(commands)
+        self.assertEqual(
+            commands[-1],
+            "tc qdisc add dev eth0 parent 1:2 handle 20: netem delay 75ms 10ms distribution normal loss 1%",
+        )
+        self.assertFalse([command for command in commands if "dst" in command])
+
+    def test_link_only(self):
+        commands = tc_commands(None, {self.PEER_IP: NetworkProfile(rate_mbit=20)})
+        self.assertUnimpairedRpc(commands)
+        self.assertFalse([command for command in commands if "parent 1:2 " in command])
+        self.assertEqual(
+            commands[-3:],
+            [
+                "tc class add dev eth0 parent 1: classid 1:10 htb rate 100gbit",
+                "tc qdisc add dev eth0 parent 1:10 handle 100: netem rate 20mbit",
+                f"tc filter add dev eth0 protocol ip parent 1: prio 2 u32 match ip dst {self.PEER_IP}/32 flowid 1:10",
+            ],
+        )
+
+    def test_mixed(self):
+        commands = tc_commands(
+            NETWORK_PROFILES["same-region"],
+            {
+                self.PEER_IP: NETWORK_PROFILES["intercontinental"],
+                # a noop link exempts the peer from the default profile
+                self.OTHER_PEER_IP: NETWORK_PROFILES["none"],
+            },
+        )
+        self.assertUnimpairedRpc(commands)
+        self.assertIn(
+            f"tc qdisc add dev eth0 parent 1:2 handle 20: netem {NETWORK_PROFILES['same-region'].netem_args()}",
+            commands,
+        )
+        self.assertIn(
+            f"tc qdisc add dev eth0 parent 1:10 handle 100: netem {NETWORK_PROFILES['intercontinental'].netem_args()}",
+            commands,
+        )
+        self.assertIn(
+            f"tc filter add dev eth0 protocol ip parent 1: prio 2 u32 match ip dst {self.OTHER_PEER_IP}/32 flowid 1:11",
+            commands,
+        )
+        self.assertFalse([command for command in commands if "parent 1:11 " in command])
+
+    def test_apply_without_tc(self):
+        container = mock.Mock()
+        container.name = "nanotest_node_1"
+        container.exec_run.return_value = (127, b"exec: tc: not found")
+
+        # nothing to apply, no need for tc
+        apply_impairment(container, NETWORK_PROFILES["none"])
+
+        with self.assertRaisesRegex(RuntimeError, "`tc` not found"):
+            apply_impairment(container, NETWORK_PROFILES["lossy"])
+        # no impairment command is run once tc is known to be missing
+        self.assertEqual(container.exec_run.call_args.args, ("tc -V",))
+
+
+# log lines in the legacy nano_node format (node.logging.single_line_record), prefixed by `docker logs --timestamps`
+# reconstructed from the node log formats, replace with lines captured from the node image when updating the patterns
+BLOCK_HASH = "9D1D3B2ADD2C57B2DC1C6D5A2A9C43E5F1F0E0C3E3D27A2D1B3B4D4C40B4D1E5"
+PREVIOUS_HASH = "6A0B5F5E3C1E0E5B1A2E1A2A1F0B9E7C8D6B1E2F3A4B5C6D7E8F9A0B1C2D3E4F"
+VOTE_HASH = "1F2E3D4C5B6A79881F2E3D4C5B6A79881F2E3D4C5B6A79881F2E3D4C5B6A7988"
+LOG_LINES = {
+    "block_processed": (
+        "2022-09-01T12:00:00.123456789Z [2022-Sep-01 12:00:00.123456]: "
+        f"Processing block {BLOCK_HASH}: "
+        '{"type": "state", "account": "nano_3e3j5tkog48pnny9dmfzj1r16pg8t1e76dz5tmac6iq689wyjfpiij4txtdo", '
+        f'"previous": "{PREVIOUS_HASH}", '
+        '"representative": "nano_1111111111111111111111111111111111111111111111111111hifc8npp", '
+        '"balance": "1024", "link": "0000000000000000000000000000000000000000000000000000000000000000", '
+        '"link_as_account": "nano_1111111111111111111111111111111111111111111111111111hifc8npp", '
+        '"signature": "00", "work": "0000000000000000"}'
+    ),
+    "vote_received": (
+        "2022-09-01T12:00:00.5Z [2022-Sep-01 12:00:00.500000]: "
+        "Vote from: nano_3e3j5tkog48pnny9dmfzj1r16pg8t1e76dz5tmac6iq689wyjfpiij4txtdo "
+        "timestamp: 18446744073709551615 duration 4096ms "
+        f"block(s): {BLOCK_HASH}, {VOTE_HASH},  status: Vote"
+    ),
+    "vote_tally": (
+        "2022-09-01T12:00:01Z [2022-Sep-01 12:00:01.000000]: "
+        f"Election erased for root {PREVIOUS_HASH}{BLOCK_HASH}, confirmed: true"
+    ),
+    "network": (
+        "2022-09-01T12:00:01Z [2022-Sep-01 12:00:01.000000]: "
+        "Connection refused for 172.18.0.3:17075"
+    ),
+}
+
+
+class TestLogParsing(unittest.TestCase):
+    def parse(self, name):
+        return list(parse_log_line(LOG_LINES[name].encode()))
+
+    def test_block_processed(self):
+        [(timestamp, kind, hashes)] = self.parse("block_processed")
+        self.assertAlmostEqual(timestamp, 1662033600.123456, places=5)
+        self.assertEqual(kind, EventKind.BLOCK_PROCESSED)
+        # hashes in the serialized block are not events of their own
+        self.assertEqual(hashes, [BLOCK_HASH.encode()])
+
+    def test_vote_received(self):
+        [(timestamp, kind, hashes)] = self.parse("vote_received")
+        self.assertAlmostEqual(timestamp, 1662033600.5, places=5)
+        self.assertEqual(kind, EventKind.VOTE_RECEIVED)
+        self.assertEqual(hashes, [BLOCK_HASH.encode(), VOTE_HASH.encode()])
+
+    def test_ignored(self):
+        self.assertEqual(self.parse("vote_tally"), [])
+        self.assertEqual(self.parse("network"), [])
+
+
+# messages in the node websocket format, the confirmation topic without the block contents
+WEBSOCKET_MESSAGES = {
+    "started_election": (
+        '{"topic": "started_election", "time": "1662033600250", '
+        f'"message": {{"hash": "{BLOCK_HASH}"}}}}'
+    ),
+    "confirmation": (
+        '{"topic": "confirmation", "time": "1662033601750", '
+        '"message": {"account": "nano_3e3j5tkog48pnny9dmfzj1r16pg8t1e76dz5tmac6iq689wyjfpiij4txtdo", '
+        f'"amount": "1024", "hash": "{BLOCK_HASH}", "confirmation_type": "active_quorum"}}}}'
+    ),
+    "ack": '{"ack": "subscribe", "time": "1662033600000"}',
+}
+
+
+class TestWebsocketParsing(unittest.TestCase):
+    def test_started_election(self):
+        timestamp, kind, hashes = parse_websocket_message(
+            WEBSOCKET_MESSAGES["started_election"]
+        )
+        self.assertAlmostEqual(timestamp, 1662033600.25)
+        self.assertEqual(kind, EventKind.ELECTION_STARTED)
+        self.assertEqual(hashes, [BLOCK_HASH.encode()])
+
+    def test_confirmation(self):
+        timestamp, kind, hashes = parse_websocket_message(
+            WEBSOCKET_MESSAGES["confirmation"]
+        )
+        self.assertAlmostEqual(timestamp, 1662033601.75)
+        self.assertEqual(kind, EventKind.ELECTION_CONFIRMED)
+        self.assertEqual(hashes, [BLOCK_HASH.encode()])
+
+    def test_ignored(self):
+        self.assertIsNone(parse_websocket_message(WEBSOCKET_MESSAGES["ack"]))
+
+
+class TestBlockEventStore(unittest.TestCase):
+    def test_timeline_of_all_sources(self):
+        store = BlockEventStore()
+        for line in ("block_processed", "vote_received"):
+            for timestamp, kind, hashes in parse_log_line(LOG_LINES[line].encode()):
+                for block_hash in hashes:
+                    store.add(timestamp, "node_1", kind, block_hash)
+        for message in ("started_election", "confirmation"):
+            timestamp, kind, hashes = parse_websocket_message(
+                WEBSOCKET_MESSAGES[message]
+            )
+            store.add(timestamp, "node_1", kind, hashes[0])
+
+        self.assertEqual(
+            [event.kind for event in store.timeline(BLOCK_HASH)],
+            [
+                EventKind.BLOCK_PROCESSED,
+                EventKind.ELECTION_STARTED,
+                EventKind.VOTE_RECEIVED,
+                EventKind.ELECTION_CONFIRMED,
+            ],
+        )
+        self.assertEqual(len(store.timeline(VOTE_HASH)), 1)
+
+    def test_eviction(self):
+        store = BlockEventStore(max_events=3)
+        # interleaved hashes and seconds, so every eviction pops from shared buckets
+        store.add(10.0, "node_1", EventKind.BLOCK_PROCESSED, BLOCK_HASH)
+        store.add(10.5, "node_1", EventKind.BLOCK_PROCESSED, VOTE_HASH)
+        store.add(11.0, "node_2", EventKind.BLOCK_PROCESSED, BLOCK_HASH)
+        store.add(11.5, "node_2", EventKind.BLOCK_PROCESSED, VOTE_HASH)
+        store.add(12.0, "node_1", EventKind.VOTE_RECEIVED, BLOCK_HASH)
+
+        self.assertEqual(len(store), 3)
+        self.assertEqual(store.evicted, 2)
+        self.assertEqual(
+            [(event.timestamp, event.node) for event in store.timeline(BLOCK_HASH)],
+            [(11.0, "node_2"), (12.0, "node_1")],
+        )
+        self.assertEqual(
+            [event.timestamp for event in store.timeline(VOTE_HASH)], [11.5]
+        )
+        self.assertEqual(store.between(0, 100), sorted(store.between(11, 12)))
+        self.assertEqual(store.between(10, 10.9), [])
+
+        store.add(13.0, "node_1", EventKind.VOTE_RECEIVED, BLOCK_HASH)
+        store.add(13.5, "node_1", EventKind.VOTE_RECEIVED, BLOCK_HASH)
+        # last event of the hash evicted, so the hash is gone from the index
+        self.assertEqual(store.block_hashes(), [BLOCK_HASH])
+        self.assertEqual(store.timeline(VOTE_HASH), [])
+
+    def test_between(self):
+        store = BlockEventStore()
+        for timestamp in (9.99, 10.0, 10.4, 10.6, 11.0, 11.2, 12.0):
+            store.add(timestamp, "node_1", EventKind.BLOCK_PROCESSED, BLOCK_HASH)
+
+        # bounds are inclusive and may fall inside a second
+        self.assertEqual(
+            [event.timestamp for event in store.between(10.4, 11.0)],
+            [10.4, 10.6, 11.0],
+        )
+        self.assertEqual(
+            [event.timestamp for event in store.between(10.0, 10.0)], [10.0]
+        )
+        self.assertEqual(store.between(12.5, 20), [])
+
+
+class TestWorkThresholds(unittest.TestCase):
+    def test_max_of_applicable_epochs(self):
+        thresholds = WorkThresholds(
+            epoch_1="ffffffc000000000",
+            epoch_2="fffffff800000000",
+            epoch_2_receive="fffffe0000000000",
+        )
+        self.assertEqual(thresholds.send, "fffffff800000000")
+        # epoch 0/1 accounts need epoch_1 even for receives
+        self.assertEqual(thresholds.receive, "ffffffc000000000")
+        self.assertEqual(thresholds.lookahead, "fffffff800000000")
+        self.assertFalse(thresholds.trivial)
+
+    def test_load_from_node_env(self):
+        thresholds = load_work_thresholds()
+        self.assertEqual(thresholds, WorkThresholds(*["0000000000000000"] * 3))
+        self.assertTrue(thresholds.trivial)
+
+
+class TestWorkGenerator(unittest.TestCase):
+    DIFFICULTY = "ff00000000000000"
+
+    def setUp(self):
+        self.generator = WorkGenerator(
+            WorkThresholds(*[self.DIFFICULTY] * 3), processes=1, max_pending=2
+        )
+        self.addCleanup(self.generator.shutdown)
+        self.roots = [f"{n + 1:064X}" for n in range(3)]
+
+    def assertValidWork(self, root, work):
+        nanolib.validate_work(root, work, self.DIFFICULTY)
+
+    def test_hit(self):
+        self.generator.precompute("a", self.roots[0])
+        self.assertValidWork(
+            self.roots[0], self.generator.work("a", self.roots[0], self.DIFFICULTY)
+        )
+        self.assertEqual((self.generator.hits, self.generator.misses), (1, 0))
+
+    def test_miss_on_other_root_or_higher_difficulty(self):
+        self.generator.precompute("a", self.roots[0])
+        self.assertValidWork(
+            self.roots[1], self.generator.work("a", self.roots[1], self.DIFFICULTY)
+        )
+
+        self.generator.precompute("b", self.roots[0])
+        work = self.generator.work("b", self.roots[0], "fff0000000000000")
+        nanolib.validate_work(self.roots[0], work, "fff0000000000000")
+
+        self.assertEqual((self.generator.hits, self.generator.misses), (0, 2))
+
+    def test_eviction(self):
+        for account, root in zip("abc", self.roots):
+            self.generator.precompute(account, root)
+
+        # max_pending is 2, the oldest account is evicted
+        self.assertEqual(len(self.generator), 2)
+        self.generator.work("a", self.roots[0], self.DIFFICULTY)
+        self.generator.work("b", self.roots[1], self.DIFFICULTY)
+        self.generator.work("c", self.roots[2], self.DIFFICULTY)
+        self.assertEqual((self.generator.hits, self.generator.misses), (2, 1))
+
+    def test_discard_and_trivial(self):
+        self.generator.precompute("a", self.roots[0])
+        self.generator.discard("a")
+        self.generator.work("a", self.roots[0], self.DIFFICULTY)
+        self.assertEqual(self.generator.misses, 1)
+
+        trivial = WorkGenerator(WorkThresholds(*["0000000000000000"] * 3))
+        trivial.precompute("a", self.roots[0])
+        self.assertEqual(len(trivial), 0)
+
+
+class FakeInspectedNode:
+    def __init__(self, name):
+        self.name = name
+        self.roots = []
+        self.memory_usage = 0
+        self.rpc = mock.Mock()
+        self.rpc.call.return_value = {"online_stake_total": "100"}
+
+    @property
+    def aec(self):
+        return nanotest.AecInfo(0, len(self.roots), list(self.roots))
+
+    def confirmation_info(self, root):
+        return {"total_tally": "60", "final_tally": "0", "voters": "3", "blocks": {}}
+
+    @property
+    def stat_objects(self):
+        return {"node": {"ledger": {"count": "2", "size": "8"}}}
+
+
+class TestElectionInspector(unittest.TestCase):
+    def setUp(self):
+        self.now = 0
+        patcher = mock.patch("time.time", lambda: self.now)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+        self.node = FakeInspectedNode("node_a")
+        self.inspector = ElectionInspector([self.node], max_roots=1, slowest_count=2)
+        self.addCleanup(self.inspector.stop)
+
+    def sample(self, now, roots):
+        self.now = now
+        self.node.roots = roots
+        self.inspector.sample()
+
+    def test_objects_bytes(self):
+        stats = {
+            "node": {
+                "ledger": {"count": "3", "size": "16"},
+                "network": {"peers": {"count": "2", "size": "100"}},
+            }
+        }
+        self.assertEqual(objects_bytes(stats), 3 * 16 + 2 * 100)
+        self.assertEqual(objects_bytes({}), 0)
+
+    def test_finished_age_and_slowest(self):
+        self.sample(0, ["A", "B", "C"])
+        self.sample(10, ["B", "C"])
+        self.sample(30, ["C"])
+        self.sample(40, [])
+
+        ages = {election.root: election.age for election in self.inspector.finished}
+        # only one root gets confirmation_info, all of them are tracked
+        self.assertEqual(ages, {"A": 0, "B": 10, "C": 30})
+        self.assertEqual(
+            [election.root for election in self.inspector.slowest_elections()],
+            ["C", "B"],
+        )
+        self.assertEqual(self.inspector.active, {})
+
+    def test_slowest_includes_active(self):
+        self.sample(0, ["A", "B"])
+        self.sample(50, ["B"])
+        self.sample(60, ["B"])
+
+        slowest = self.inspector.slowest_elections()
+        self.assertEqual([(e.root, e.age) for e in slowest], [("B", 60), ("A", 0)])
+
+    def test_memory_growth(self):
+        self.node.memory_usage = 1000
+        self.sample(0, [])
+        self.node.memory_usage = 3000
+        self.sample(1800, [])
+
+        growth = self.inspector.memory_growth()
+        self.assertEqual(growth, {"node_a": (0, 4000)})
+
+    def test_failing_node(self):
+        failing = FakeInspectedNode("node_b")
+        failing.rpc.call.side_effect = ConnectionError("node down")
+        self.inspector.nodes.append(failing)
+
+        self.sample(0, [])
+        self.assertEqual(list(self.inspector.memory), ["node_a"])
+
+
 if __name__ == "__main__":
     unittest.main()